@@ -1,5 +1,186 @@
-def validate_user(gh_client, username):
-    """Validate that a user exists on GitHub"""
+import functools
+import itertools
+import json
+import random
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Concurrency settings for adding team members
+MEMBER_MIGRATION_WORKERS = 8
+MEMBER_BATCH_SIZE = 50
+
+# Maximum number of teams migrated concurrently within a batch
+TEAM_MIGRATION_WORKERS = 8
+
+# Maximum number of retries for a team that keeps hitting the rate limit
+TEAM_RETRY_ATTEMPTS = 5
+
+# Maximum number of parent-child links set concurrently
+PARENT_LINK_WORKERS = 16
+
+# Maximum number of membership requests in flight across all thread pools (GitHub secondary rate limits)
+MAX_CONCURRENT_REQUESTS = 20
+
+# Maximum number of users validated per GraphQL query
+USER_VALIDATION_BATCH_SIZE = 100
+
+# Retry settings for rate limit and connection errors
+RETRY_MAX_ATTEMPTS = 4
+RETRY_INITIAL_WAIT = 1
+RETRY_MAX_WAIT = 60
+
+# Organization lookups are cached for this many seconds
+ORG_CACHE_TTL = 600
+ORG_CACHE_SIZE = 8
+
+# Team lookups are cached for this many seconds, misses for a shorter time
+TEAM_LOOKUP_CACHE_SIZE = 10000
+TEAM_LOOKUP_TTL = 300
+TEAM_LOOKUP_NEGATIVE_TTL = 10
+
+# Headers shared by all REST and GraphQL requests made with a token
+_DEFAULT_HEADERS = {
+    'Accept': 'application/vnd.github.v3+json',
+    'Content-Type': 'application/json'
+}
+
+# Separators treated as equivalent when matching team names to IDP groups
+_IDP_TRANS = str.maketrans({'-': '_', ' ': '_'})
+
+# Reset timestamp embedded in rate limit error messages
+_RATE_LIMIT_TS_RE = re.compile(r'timestamp (\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})')
+
+def _idp_key(name):
+    """Normalize a team or IDP group name for idp_group_cache lookups"""
+    return name.lower().translate(_IDP_TRANS)
+
+def _graphql_url(base_api_url):
+    """Get the GraphQL endpoint for a REST API base URL (GHES serves it at /api/graphql)"""
+    if base_api_url.rstrip('/').endswith('/api/v3'):
+        return base_api_url.rstrip('/')[:-len('/v3')] + '/graphql'
+    return f"{base_api_url.rstrip('/')}/graphql"
+
+def _response_json(response):
+    """Decode a JSON response body, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+def _rate_limit_wait(exception):
+    """Get the seconds until a rate limit resets from an exception's response headers
+    Returns:
+        int: Seconds to wait, or None if the headers do not say
+    """
+    headers = {k.lower(): v for k, v in (getattr(exception, 'headers', None) or {}).items()}
+    try:
+        if 'retry-after' in headers:
+            return max(1, int(headers['retry-after']))
+        if headers.get('x-ratelimit-remaining') == '0' and 'x-ratelimit-reset' in headers:
+            return max(1, int(headers['x-ratelimit-reset']) - int(time.time()) + 1)
+    except ValueError:
+        pass
+    return None
+
+def _is_rate_limited(response):
+    """Tell whether a REST response is a primary or secondary rate limit rejection"""
+    return response.status_code == 429 or (response.status_code == 403 and (
+        response.headers.get('X-RateLimit-Remaining') == '0' or 'rate limit' in response.text.lower()))
+
+def _gh_retry(func):
+    """Retry a GitHub call on rate limit and connection errors with exponential backoff and jitter"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(1, RETRY_MAX_ATTEMPTS + 1):
+            try:
+                return func(*args, **kwargs)
+            except (RateLimitExceededException, requests.exceptions.ConnectionError) as e:
+                if attempt == RETRY_MAX_ATTEMPTS:
+                    raise
+                # Prefer the reset time reported by GitHub over blind backoff
+                wait_time = _rate_limit_wait(e)
+                if wait_time is None:
+                    wait_time = min(RETRY_MAX_WAIT, RETRY_INITIAL_WAIT * 2 ** (attempt - 1)) + random.uniform(0, 1)
+                log_and_print(f"{type(e).__name__} in {func.__name__}. Attempt {attempt}/{RETRY_MAX_ATTEMPTS}. Waiting {wait_time:.1f} seconds before retry...", "warning")
+                time.sleep(wait_time)
+    return wrapper
+
+def _team_cache_entry(team):
+    """Build the team_cache entry for a PyGithub team"""
+    return {
+        'name': team.name,
+        'description': team.description or '',
+        'privacy': team.privacy,
+        'parent': team.parent.slug if team.parent else None
+    }
+
+# Shared by the nested team/member pools; only held around a single request so it can never deadlock
+_api_semaphore = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+# Organization objects keyed by (client, org name), stored with the time they were fetched
+_org_cache = {}
+_org_cache_lock = threading.Lock()
+
+def _get_org(gh_client, org_name):
+    """Get an organization object, reusing a cached one younger than ORG_CACHE_TTL"""
+    key = (id(gh_client), org_name)
+    with _org_cache_lock:
+        cached = _org_cache.get(key)
+        if cached and time.monotonic() - cached[0] < ORG_CACHE_TTL:
+            return cached[1]
+    
+    org = gh_client.get_organization(org_name)
+    with _org_cache_lock:
+        if key not in _org_cache and len(_org_cache) >= ORG_CACHE_SIZE:
+            # Evict the oldest entry
+            del _org_cache[min(_org_cache, key=lambda k: _org_cache[k][0])]
+        _org_cache[key] = (time.monotonic(), org)
+    return org
+
+# Team lookup results keyed by (lookup, org name, team name, ...), stored with their expiry time
+_team_lookup_cache = {}
+_team_lookup_lock = threading.Lock()
+
+def _cached_team_lookup(key, lookup, is_miss):
+    """Return a cached team lookup result, calling lookup() when missing or expired
+    Args:
+        key: Cache key for the lookup
+        lookup: Function performing the API call
+        is_miss: Function telling whether a result is negative (cached for a shorter time)
+    """
+    with _team_lookup_lock:
+        cached = _team_lookup_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+    
+    result = lookup()
+    ttl = TEAM_LOOKUP_NEGATIVE_TTL if is_miss(result) else TEAM_LOOKUP_TTL
+    with _team_lookup_lock:
+        if key not in _team_lookup_cache and len(_team_lookup_cache) >= TEAM_LOOKUP_CACHE_SIZE:
+            # Evict the oldest entry
+            del _team_lookup_cache[next(iter(_team_lookup_cache))]
+        _team_lookup_cache[key] = (time.monotonic() + ttl, result)
+    return result
+
+def validate_user(gh_client, username, validated_users=None):
+    """Validate that a user exists on GitHub
+    Args:
+        gh_client: GitHub instance to look the user up on
+        username: Login of the user to validate
+        validated_users: Optional results of batch_validate_users to avoid API calls
+    """
+    if validated_users is not None and username.strip().lower() in validated_users:
+        login = validated_users[username.strip().lower()]
+        if not login:
+            log_and_print(f"User '{username}' not found on GitHub", "warning")
+        return login
+    
     try:
         user = gh_client.get_user(username.strip())
         return user.login if user else None
@@ -10,43 +191,215 @@ def validate_user(gh_client, username):
         log_and_print(f"Error validating user '{username}': {str(e)}", "error")
         return None
 
-def user_exists_in_org(gh_client, org_name, username):
-    """Check if a user exists in the organization"""
+def batch_validate_users(token, usernames):
+    """Validate many users on the target GitHub instance with batched GraphQL queries
+    Args:
+        token: GitHub token
+        usernames: Logins of the users to validate
+    Returns:
+        dict: Mapping of lowercased login to the canonical login, or None if the user
+              does not exist. Users whose batch failed are left out.
+    """
+    headers = {**_DEFAULT_HEADERS, 'Authorization': f'Bearer {token}'}
+    url = _graphql_url(GH_TARGET_BASE_API_URL)
+    logins = list(dict.fromkeys(u.strip() for u in usernames if u and u.strip()))
+    validated_users = {}
+    
+    for i in range(0, len(logins), USER_VALIDATION_BATCH_SIZE):
+        batch = logins[i:i + USER_VALIDATION_BATCH_SIZE]
+        fields = " ".join(f"user{n}: user(login: {json.dumps(login)}) {{ login }}" for n, login in enumerate(batch))
+        
+        try:
+            response = make_github_request('post', url, headers=headers, json_data={'query': f"query {{ {fields} }}"})
+            if response.status_code != 200:
+                log_and_print(f"Failed to validate users via GraphQL: {response.status_code} - {response.text}", "error")
+                continue
+            
+            # Unknown logins come back as null fields alongside NOT_FOUND errors
+            data = _response_json(response).get('data') or {}
+            if not data:
+                log_and_print(f"GraphQL error validating users: {response.text}", "error")
+                continue
+            
+            for n, login in enumerate(batch):
+                user = data.get(f"user{n}")
+                validated_users[login.lower()] = user['login'] if user else None
+        except Exception as e:
+            log_and_print(f"Error validating users via GraphQL: {str(e)}", "error")
+    
+    return validated_users
+
+@_gh_retry
+def get_org_member_logins(gh_client, org_name):
+    """Get the lowercased logins of all members of an organization
+    Args:
+        gh_client: GitHub instance for the organization
+        org_name: Name of the organization
+    Returns:
+        frozenset: Lowercased member logins
+    """
+    org = _get_org(gh_client, org_name)
+    return frozenset(member.login.lower() for member in org.get_members())
+
+def _graphql_list_org_members(token, org_name):
+    """Get the lowercased logins of all organization members via GraphQL
+    Args:
+        token: GitHub token
+        org_name: Name of the organization
+    Returns:
+        frozenset: Lowercased member logins, or None if the query failed
+    """
+    headers = {**_DEFAULT_HEADERS, 'Authorization': f'Bearer {token}'}
+    
+    query = """
+    query($org: String!, $cursor: String) {
+      organization(login: $org) {
+        membersWithRole(first: 100, after: $cursor) {
+          nodes { login }
+          pageInfo { hasNextPage endCursor }
+        }
+      }
+    }
+    """
+    url = _graphql_url(GH_TARGET_BASE_API_URL)
+    logins = set()
+    cursor = None
+    
+    while True:
+        data = {'query': query, 'variables': {'org': org_name, 'cursor': cursor}}
+        response = make_github_request('post', url, headers=headers, json_data=data)
+        
+        if response.status_code != 200:
+            log_and_print(f"Failed to list members of '{org_name}' via GraphQL: {response.status_code} - {response.text}", "error")
+            return None
+        
+        result = _response_json(response)
+        if result.get('errors') or not (result.get('data') or {}).get('organization'):
+            log_and_print(f"GraphQL error listing members of '{org_name}': {result.get('errors')}", "error")
+            return None
+        
+        members = result['data']['organization']['membersWithRole']
+        logins.update(node['login'].lower() for node in members['nodes'] if node)
+        
+        if not members['pageInfo']['hasNextPage']:
+            return frozenset(logins)
+        cursor = members['pageInfo']['endCursor']
+
+def fetch_all_teams_graphql(org_name, token, base_api_url):
+    """Get all teams of an organization via GraphQL
+    Args:
+        org_name: Name of the organization
+        token: GitHub token
+        base_api_url: REST API base URL of the GitHub instance hosting the organization
+    Returns:
+        dict: Mapping of team slug to its name, description, privacy and parent slug,
+              or None if the query failed
+    """
+    headers = {**_DEFAULT_HEADERS, 'Authorization': f'Bearer {token}'}
+    
+    query = """
+    query($org: String!, $cursor: String) {
+      organization(login: $org) {
+        teams(first: 100, after: $cursor) {
+          nodes { name slug description privacy parentTeam { slug } }
+          pageInfo { hasNextPage endCursor }
+        }
+      }
+    }
+    """
+    # GraphQL reports privacy as SECRET/VISIBLE, REST as secret/closed
+    privacy_map = {'SECRET': 'secret', 'VISIBLE': 'closed'}
+    url = _graphql_url(base_api_url)
+    teams = {}
+    cursor = None
+    
+    while True:
+        data = {'query': query, 'variables': {'org': org_name, 'cursor': cursor}}
+        response = make_github_request('post', url, headers=headers, json_data=data)
+        
+        if response.status_code != 200:
+            log_and_print(f"Failed to list teams of '{org_name}' via GraphQL: {response.status_code} - {response.text}", "error")
+            return None
+        
+        result = _response_json(response)
+        if result.get('errors') or not (result.get('data') or {}).get('organization'):
+            log_and_print(f"GraphQL error listing teams of '{org_name}': {result.get('errors')}", "error")
+            return None
+        
+        page = result['data']['organization']['teams']
+        for node in page['nodes']:
+            teams[node['slug']] = {
+                'name': node['name'],
+                'description': node['description'] or '',
+                'privacy': privacy_map.get(node['privacy'], 'closed'),
+                'parent': node['parentTeam']['slug'] if node['parentTeam'] else None
+            }
+        
+        if not page['pageInfo']['hasNextPage']:
+            return teams
+        cursor = page['pageInfo']['endCursor']
+
+def user_exists_in_org(gh_client, org_name, username, target_members_cache=None, validated_users=None):
+    """Check if a user exists in the organization
+    Args:
+        gh_client: GitHub instance for the organization
+        org_name: Name of the organization
+        username: Login of the user to check
+        target_members_cache: Optional set of lowercased member logins to avoid API calls
+        validated_users: Optional results of batch_validate_users to avoid API calls
+    """
     if not username or not username.strip():
         return False
         
     # First validate the user exists on GitHub
-    validated_username = validate_user(gh_client, username)
+    validated_username = validate_user(gh_client, username, validated_users)
     if not validated_username:
         return False
     
-    rate_limited = True
-    max_attempts = 2  # Prevent deep recursion
-    attempt = 0
+    # Answer from the pre-fetched member set when available
+    if target_members_cache is not None:
+        return validated_username.lower() in target_members_cache
     
-    while rate_limited and attempt < max_attempts:
-        attempt += 1
-        try:
-            org = gh_client.get_organization(org_name)
-            try:
-                # Check if user is in the members list
-                members = org.get_members()
-                result = any(member.login == validated_username for member in members)
-                rate_limited = False  # Success, exit the loop
-                return result
-            except GithubException as e:
-                log_and_print(f"Error checking members for '{validated_username}': {str(e)}", "error")
-                return False
-        except RateLimitExceededException:
-            log_and_print(f"Rate limit exceeded when checking if '{username}' is in org, waiting for reset", "warning")
-            smart_rate_limit_handler(gh_client)
-            # Will retry in the next loop iteration
-        except Exception as e:
-            log_and_print(f"Error checking user existence for '{username}': {str(e)}", "error")
-            return False
+    return _check_org_membership(org_name, validated_username)
+
+@_gh_retry
+def _check_org_membership(org_name, username):
+    """Check org membership with a single request: 204 if the user is a member, 404 otherwise
+    Raises:
+        RateLimitExceededException: When rate limited, so the call is retried instead of reported as not found
+        requests.exceptions.HTTPError: On any other unexpected response
+    """
+    headers = {**_DEFAULT_HEADERS, 'Authorization': f'Bearer {GH_TARGET_TOKEN}'}
+    url = f"{GH_TARGET_BASE_API_URL}/orgs/{org_name}/members/{username}"
     
-    return False  # Return false if we exhausted our attempts
+    with _api_semaphore:
+        response = make_github_request('get', url, headers=headers)
+    if response.status_code == 204:
+        return True
+    if response.status_code == 404:
+        return False
+    if _is_rate_limited(response):
+        raise RateLimitExceededException(response.status_code, {'message': response.text}, dict(response.headers))
+    log_and_print(f"Unexpected response checking if '{username}' is in org: {response.status_code} - {response.text}", "warning")
+    response.raise_for_status()
+    raise requests.exceptions.HTTPError(f"Unexpected status {response.status_code} checking membership of '{username}'", response=response)
 
+@_gh_retry
+@functools.lru_cache(maxsize=8)
+def _authenticated_login(gh_client):
+    """Get the login of the user the client is authenticated as
+    Returns:
+        str: The login, or None when the token cannot read GET /user (e.g. GitHub App installation tokens)
+    """
+    try:
+        return gh_client.get_user().login
+    except RateLimitExceededException:
+        raise
+    except GithubException as e:
+        log_and_print(f"Could not determine the authenticated user: {str(e)}", "warning")
+        return None
+
+@_gh_retry
 def create_gh_team(gh_target, org_name, team_name, description="", privacy="closed", target_teams_cache=None):
     """Create a new team or get existing team in target organization
     Args:
@@ -58,7 +411,7 @@ def create_gh_team(gh_target, org_name, team_name, description="", privacy="clos
         target_teams_cache: Cache of target teams to avoid repeated API calls
     """
     try:
-        org = gh_target.get_organization(org_name)
+        org = _get_org(gh_target, org_name)
         
         # Check if team exists using the cache
         # If cache is not provided, initialize an empty dict to avoid fallback behavior
@@ -83,6 +436,11 @@ def create_gh_team(gh_target, org_name, team_name, description="", privacy="clos
         except GithubException as e:
             # Handle specific GitHub exceptions
             if e.status == 422:
+                # A retried POST may have created the team on an earlier attempt, so pick it up instead of failing
+                team = get_team_by_name(gh_target, org_name, team_name)
+                if team:
+                    log_and_print(f"Team '{team_name}' already exists in organization '{org_name}' with privacy '{team.privacy}'", "warning")
+                    return team, "exist"
                 log_and_print(f"Validation failed while creating team '{team_name}': {str(e)}", "error")
             elif e.status == 403:
                 log_and_print(f"Permission denied while creating team '{team_name}': {str(e)}", "error")
@@ -130,96 +488,133 @@ def get_team_by_name(gh_target, org_name, team_name):
         Team object if found, None otherwise
     """
     try:
-        org = gh_target.get_organization(org_name)
-        return next((team for team in org.get_teams() if team.name == team_name), None)
+        org = _get_org(gh_target, org_name)
+        try:
+            # Callers pass source team slugs, which match the target slugs for migrated teams
+            return org.get_team_by_slug(team_name.lower())
+        except UnknownObjectException:
+            # Name may differ from the slug, fall back to listing teams
+            return next((team for team in org.get_teams() if team.name == team_name), None)
     except Exception as e:
         log_and_print(f"Error getting team '{team_name}': {str(e)}", "error")
         return None
 
-def migrate_team_members(source_team, target_team, gh_target, target_org):
-    """Migrate members from source team to target team"""
+@_gh_retry
+def _get_team_maintainers(team):
+    """Get the logins of a team's maintainers"""
+    return {member.login for member in team.get_members(role='maintainer')}
+
+@_gh_retry
+def _add_team_membership(team, member, role):
+    """Add or update a user's membership in a team"""
+    with _api_semaphore:
+        team.add_membership(member, role=role)
+
+def get_team_by_name_cached(gh_target, org_name, team_name):
+    """Cached version of get_team_by_name"""
+    return _cached_team_lookup(
+        ('team', org_name, team_name.lower()),
+        lambda: get_team_by_name(gh_target, org_name, team_name),
+        lambda team: team is None
+    )
+
+def migrate_team_members(source_team, target_team, gh_target, target_org, target_members_cache=None):
+    """Migrate members from source team to target team
+    Args:
+        source_team: Team to copy members from
+        target_team: Team to add members to
+        gh_target: GitHub instance for target organization
+        target_org: Name of target organization
+        target_members_cache: Optional set of lowercased target org member logins
+    """
     users_status = {}
-    member_details = []
+    member_details = deque()
     members_migrated = 0
     members_failed = 0
     
     try:
-        # Get source team members with rate limit handling
-        source_members = []
-        try:
-            source_members = list(source_team.get_members())
-        except RateLimitExceededException:
-            log_and_print(f"Rate limit exceeded when getting members for team '{source_team.name}'. Waiting for reset...", "warning")
-            # Try again after waiting
-            source_members = list(source_team.get_members())
-            
-        log_and_print(f"Found {len(source_members)} members in source team '{source_team.name}'")
+        # Stream source team members so migration starts as soon as the first page arrives
+        source_members = iter(source_team.get_members())
+        total_members = 0
         
-        for index, member in enumerate(source_members, 1):
-            log_and_print(f"Processing user '{member.login}' for team '{source_team.name}' ({index}/{len(source_members)})")
+        # Get source team maintainers once instead of checking each member's role
+        maintainers = _get_team_maintainers(source_team)
+        
+        def _process_member(member, index):
+            """Migrate a single member, returning (login, status, detail)"""
+            log_and_print(f"Processing user '{member.login}' for team '{source_team.name}' (#{index})")
             
             try:
                 # Check if user exists in target organization
-                if not user_exists_in_org(gh_target, target_org, member.login):
-                    users_status[member.login] = {
+                if not user_exists_in_org(gh_target, target_org, member.login, target_members_cache, validated_users):
+                    return member.login, {
                         'status': 'skipped',
                         'reason': 'User not found in target organization'
-                    }
-                    members_failed += 1
-                    member_details.append(f"{member.login}: Skipped - User not found in target organization")
-                    continue
+                    }, f"{member.login}: Skipped - User not found in target organization"
                 
-                # Get user's role in source team with rate limit handling
-                role = None
-                try:
-                    log_and_print(f"Checking current role for user '{member.login}' in team '{source_team.name}'")
-                    role = 'maintainer' if source_team.get_team_membership(member).role == 'maintainer' else 'member'
-                except RateLimitExceededException:
-                    log_and_print(f"Rate limit exceeded when checking role for '{member.login}'. Waiting for reset...", "warning")
-                    # Try again after waiting
-                    role = 'maintainer' if source_team.get_team_membership(member).role == 'maintainer' else 'member'
+                # Get user's role in source team from the pre-fetched maintainers
+                role = 'maintainer' if member.login in maintainers else 'member'
                 
                 # Add user to target team with appropriate role
                 log_and_print(f"Adding/Updating user '{member.login}' with role '{role}' to team '{source_team.name}'")
-                try:
-                    target_team.add_membership(member, role=role)
-                except RateLimitExceededException:
-                    log_and_print(f"Rate limit exceeded when adding '{member.login}'. Waiting for reset...", "warning")
-                    smart_rate_limit_handler(target_team._requester._Requester__connection.rate_limiting)
-                    # Try again after waiting
-                    target_team.add_membership(member, role=role)
+                _add_team_membership(target_team, member, role)
                 
-                users_status[member.login] = {
+                log_and_print(f"Successfully added {member.login} as {role} to team '{source_team.name}'", "success")
+                return member.login, {
                     'status': 'success',
                     'role': role
-                }
-                members_migrated += 1
-                member_details.append(f"{member.login}: Success - Added as {role}")
-                log_and_print(f"Successfully added {member.login} as {role} to team '{source_team.name}'", "success")
+                }, f"{member.login}: Success - Added as {role}"
                 
             except RateLimitExceededException as e:
                 log_and_print(f"Rate limit exceeded when processing '{member.login}'. This user will be skipped.", "error")
-                users_status[member.login] = {
+                return member.login, {
                     'status': 'failed',
                     'error': f"Rate limit exceeded: {str(e)}"
-                }
-                members_failed += 1
-                member_details.append(f"{member.login}: Failed - Rate limit exceeded")
+                }, f"{member.login}: Failed - Rate limit exceeded"
             except Exception as e:
-                users_status[member.login] = {
+                log_and_print(f"Error adding user '{member.login}' to team '{source_team.name}': {str(e)}", "error")
+                return member.login, {
                     'status': 'failed',
                     'error': str(e)
-                }
-                members_failed += 1
-                member_details.append(f"{member.login}: Failed - {str(e)}")
-                log_and_print(f"Error adding user '{member.login}' to team '{source_team.name}': {str(e)}", "error")
+                }, f"{member.login}: Failed - {str(e)}"
+        
+        # Add members concurrently, one batch at a time so the rate limit can be checked in between
+        with ThreadPoolExecutor(max_workers=MEMBER_MIGRATION_WORKERS) as executor:
+            while True:
+                batch = list(itertools.islice(source_members, MEMBER_BATCH_SIZE))
+                if not batch:
+                    break
+                
+                # Validate the whole batch up front instead of one request per member
+                validated_users = batch_validate_users(GH_TARGET_TOKEN, [member.login for member in batch])
+                
+                futures = [
+                    executor.submit(_process_member, member, index)
+                    for index, member in enumerate(batch, total_members + 1)
+                ]
+                total_members += len(batch)
+                
+                for future in as_completed(futures):
+                    login, status, detail = future.result()
+                    users_status[login] = status
+                    member_details.append(detail)
+                    if status['status'] == 'success':
+                        members_migrated += 1
+                    else:
+                        members_failed += 1
+                
+                # Check rate limit status before dispatching the next batch
+                if len(batch) == MEMBER_BATCH_SIZE:
+                    smart_rate_limit_handler(gh_target)
+        
+        log_and_print(f"Processed {total_members} members in source team '{source_team.name}'")
         
         return {
             'success': members_failed == 0,
-            'total_members': len(source_members),
+            'total_members': total_members,
             'members_migrated': members_migrated,
             'members_failed': members_failed,
-            'member_details': member_details
+            'member_details': list(member_details)
         }
             
     except RateLimitExceededException as e:
@@ -230,7 +625,7 @@ def migrate_team_members(source_team, target_team, gh_target, target_org):
             'total_members': 0,
             'members_migrated': members_migrated,
             'members_failed': members_failed,
-            'member_details': member_details + [f"Error: Rate limit exceeded"]
+            'member_details': list(member_details) + [f"Error: Rate limit exceeded"]
         }
     except Exception as e:
         error_msg = f"Error migrating members for team '{source_team.name}': {str(e)} \nError type: {type(e)} \nError details: {str(e)}"
@@ -240,7 +635,7 @@ def migrate_team_members(source_team, target_team, gh_target, target_org):
             'total_members': 0,
             'members_migrated': members_migrated,
             'members_failed': members_failed,
-            'member_details': member_details + [f"Error: {str(e)}"]
+            'member_details': list(member_details) + [f"Error: {str(e)}"]
         }
 
 def check_external_idp_group_exists(org_name, idp_group_name, token, display_name=None):
@@ -253,14 +648,11 @@ def check_external_idp_group_exists(org_name, idp_group_name, token, display_nam
     Returns:
         bool: True if the group exists, False otherwise
     """
-    headers = {
-        'Accept': 'application/vnd.github.v3+json',
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json'
-    }
+    headers = {**_DEFAULT_HEADERS, 'Authorization': f'Bearer {token}'}
     
     # If display_name is not provided, use the idp_group_name
     search_name = display_name or idp_group_name
+    search_name_lower = search_name.lower()
     
     # Build URL to search for external groups
     url = f"{GH_TARGET_BASE_API_URL}/orgs/{org_name}/external-groups?display_name={search_name}"
@@ -275,17 +667,13 @@ def check_external_idp_group_exists(org_name, idp_group_name, token, display_nam
             response = make_github_request('get', url, headers=headers)
             
             if (response.status_code == 200) or (response.status_code == 201):
-                groups = response.json().get('groups', [])
+                groups = _response_json(response).get('groups', [])
                 
-                # Check if any group matches the search name
-                matching_groups = [
-                    group for group in groups 
-                    if group['group_name'].lower() == search_name.lower() or 
-                       search_name.lower() in group['group_name'].lower()
-                ]
+                # Check if any group matches the search name exactly
+                matching_group = next((g for g in groups if g['group_name'].lower() == search_name_lower), None)
                 
-                if matching_groups:
-                    group_name = matching_groups[0]['group_name']
+                if matching_group:
+                    group_name = matching_group['group_name']
                     log_and_print(f"Found matching external IDP group: '{group_name}'", "success")
                     return True
                 else:
@@ -301,11 +689,11 @@ def check_external_idp_group_exists(org_name, idp_group_name, token, display_nam
                     wait_time = max(1, reset_timestamp - int(time.time()) + 1)
                 else:
                     # Extract timestamp from error response if possible
-                    match = re.search(r'timestamp (\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})', response.text)
+                    match = _RATE_LIMIT_TS_RE.search(response.text)
                     if match:
                         try:
-                            reset_time = datetime.datetime.strptime(match.group(1), '%Y-%m-%d %H:%M:%S')
-                            wait_time = max(1, int((reset_time - datetime.datetime.utcnow()).total_seconds()) + 1)
+                            reset_time = datetime.datetime.strptime(match.group(1), '%Y-%m-%d %H:%M:%S').replace(tzinfo=datetime.timezone.utc)
+                            wait_time = max(1, int((reset_time - datetime.datetime.now(datetime.timezone.utc)).total_seconds()) + 1)
                         except:
                             # Use exponential backoff if timestamp parsing fails
                             wait_time = retry_delay * (2 ** (retry_count - 1))
@@ -352,6 +740,7 @@ def setup_logging(output_folder):
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
 
+@_gh_retry
 def remove_users_from_team(org_name, team_slug, token, users):
     """Remove users from a team
     
@@ -364,66 +753,83 @@ def remove_users_from_team(org_name, team_slug, token, users):
     Returns:
         tuple: (success_count, failed_count, details)
     """
-    headers = {
-        'Accept': 'application/vnd.github.v3+json',
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json'
-    }
+    headers = {**_DEFAULT_HEADERS, 'Authorization': f'Bearer {token}'}
     
     success_count = 0
     failed_count = 0
     details = []
     
+    # Rate limit state from the most recent response, used to pace batches
+    remaining = 5000
+    reset = 0
+    
+    @_gh_retry
+    def _remove_user(username):
+        """Remove a single user, returning (removed, detail, response headers)"""
+        remove_url = f"{GH_TARGET_BASE_API_URL}/orgs/{org_name}/teams/{team_slug}/memberships/{username}"
+        
+        try:
+            log_and_print(f"Removing user '{username}' from team '{team_slug}'")
+            with _api_semaphore:
+                response = make_github_request('delete', remove_url, headers=headers)
+            
+            if response.status_code in [204, 404]:  # 204: Success, 404: User not in team
+                log_and_print(f"Successfully removed user '{username}' from team '{team_slug}'", "success")
+                return True, f"{username}: Success - Removed from team", response.headers
+            elif _is_rate_limited(response):
+                # Raise so _gh_retry waits and removes the user again instead of leaving them in the team
+                log_and_print(f"Rate limited removing user '{username}' (will retry): {response.status_code}", "warning")
+                raise RateLimitExceededException(response.status_code, {'message': response.text}, dict(response.headers))
+            elif response.status_code == 403:
+                # Permission denied - log but don't retry
+                log_and_print(f"Permission denied removing user '{username}': {response.text}", "error")
+                return False, f"{username}: Failed - Permission denied - {response.text}", response.headers
+            elif response.status_code >= 500:
+                # Server error - raise to trigger retry
+                log_and_print(f"Server error removing user '{username}' (will retry): {response.status_code}", "warning")
+                response.raise_for_status()
+            
+            log_and_print(f"Failed to remove user '{username}': {response.status_code} - {response.text}", "error")
+            return False, f"{username}: Failed - {response.status_code} - {response.text}", response.headers
+        except RateLimitExceededException:
+            raise
+        except requests.exceptions.RequestException as e:
+            # For network or GitHub API exceptions, allow retry mechanism to work
+            log_and_print(f"Network error removing user '{username}' (will retry): {str(e)}", "warning")
+            raise
+        except Exception as e:
+            log_and_print(f"Error removing user '{username}': {str(e)}", "error")
+            return False, f"{username}: Failed - {str(e)}", None
+    
     # Break users into batches to avoid overwhelming API
     batch_size = 10
     user_batches = [users[i:i + batch_size] for i in range(0, len(users), batch_size)]
     
-    for batch in user_batches:
-        for username in batch:
-            username = username.strip()
-            if not username:
-                continue
-                
-            remove_url = f"{GH_TARGET_BASE_API_URL}/orgs/{org_name}/teams/{team_slug}/memberships/{username}"
+    # Memberships are independent, so each batch is removed concurrently
+    with ThreadPoolExecutor(max_workers=batch_size) as executor:
+        for batch in user_batches:
+            usernames = [username.strip() for username in batch if username.strip()]
             
-            try:
-                log_and_print(f"Removing user '{username}' from team '{team_slug}'")
-                response = make_github_request('delete', remove_url, headers=headers)
-                
-                if response.status_code in [204, 404]:  # 204: Success, 404: User not in team
+            for removed, detail, response_headers in executor.map(_remove_user, usernames):
+                if removed:
                     success_count += 1
-                    details.append(f"{username}: Success - Removed from team")
-                    log_and_print(f"Successfully removed user '{username}' from team '{team_slug}'", "success")
-                elif response.status_code == 403:
-                    # Permission denied - log but don't retry
-                    failed_count += 1
-                    details.append(f"{username}: Failed - Permission denied - {response.text}")
-                    log_and_print(f"Permission denied removing user '{username}': {response.text}", "error")
-                elif response.status_code >= 500:
-                    # Server error - raise to trigger retry
-                    details.append(f"{username}: Failed (will retry) - {response.status_code} - {response.text}")
-                    log_and_print(f"Server error removing user '{username}' (will retry): {response.status_code}", "warning")
-                    response.raise_for_status()
                 else:
                     failed_count += 1
-                    details.append(f"{username}: Failed - {response.status_code} - {response.text}")
-                    log_and_print(f"Failed to remove user '{username}': {response.status_code} - {response.text}", "error")
-            except requests.exceptions.RequestException as e:
-                # For network or GitHub API exceptions, allow retry mechanism to work
-                log_and_print(f"Network error removing user '{username}' (will retry): {str(e)}", "warning")
-                raise
-            except Exception as e:
-                failed_count += 1
-                details.append(f"{username}: Failed - {str(e)}")
-                log_and_print(f"Error removing user '{username}': {str(e)}", "error")
-        
-        # Small delay between batches to avoid rate limiting
-        if len(user_batches) > 1 and batch != user_batches[-1]:
-            time.sleep(1)
+                details.append(detail)
+                
+                if response_headers:
+                    remaining = int(response_headers.get('x-ratelimit-remaining', remaining))
+                    reset = int(response_headers.get('x-ratelimit-reset', reset))
+            
+            # Spread the remaining rate limit budget evenly until it resets
+            if len(user_batches) > 1 and batch != user_batches[-1]:
+                wait_time = max(0.0, (reset - time.time()) / max(1, remaining))
+                time.sleep(wait_time * random.uniform(0.9, 1.1))
     
     return success_count, failed_count, details
 
-def map_external_group_to_team(org_name, team_slug, token, group_id=None, idp_group_cache=None):
+@_gh_retry
+def map_external_group_to_team(org_name, team_slug, token, group_id=None, idp_group_cache=None, check_existing_mapping=True):
     """Map an external group to a GitHub team
     Args:
         org_name: Name of the organization
@@ -431,26 +837,26 @@ def map_external_group_to_team(org_name, team_slug, token, group_id=None, idp_gr
         token: GitHub token
         group_id: External group ID (optional, if None will look up by team name)
         idp_group_cache: Optional cache of IDP groups to avoid repeated API calls
+        check_existing_mapping: Whether to check for an existing mapping first (False for new teams)
     Returns:
         bool: True if successful, False otherwise
     """
     try:
-        headers = {
-            'Accept': 'application/vnd.github.v3+json',
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
+        headers = {**_DEFAULT_HEADERS, 'Authorization': f'Bearer {token}'}
         
         # First check if the team is already mapped to the expected group
-        is_mapped, existing_mapping = check_team_external_group_mapping(org_name, team_slug, token, team_slug)
-        if is_mapped:
-            log_and_print(f"Team '{team_slug}' is already mapped to external group. No changes needed.")
-            return True
+        if check_existing_mapping:
+            is_mapped, existing_mapping = check_team_external_group_mapping_cached(org_name, team_slug, token, team_slug)
+            if is_mapped:
+                log_and_print(f"Team '{team_slug}' is already mapped to external group. No changes needed.")
+                return True
         
         # Use cache if provided, otherwise make API call
         if group_id is None:
-            if idp_group_cache and team_slug.lower() in idp_group_cache:
-                group_data = idp_group_cache[team_slug.lower()]
+            team_slug_lower = team_slug.lower()
+            idp_key = _idp_key(team_slug)
+            if idp_group_cache and idp_key in idp_group_cache:
+                group_data = idp_group_cache[idp_key]
                 group_id = group_data.get('group_id')
                 group_name = group_data.get('group_name')
                 log_and_print(f"Using cached external group '{group_name}' with ID '{group_id}' for team '{team_slug}'")
@@ -463,13 +869,13 @@ def map_external_group_to_team(org_name, team_slug, token, group_id=None, idp_gr
                     log_and_print(f"Failed to get external groups by display name: {response.status_code} - {response.text}", "error")
                     return False
                     
-                groups = response.json().get('groups', [])
+                groups = _response_json(response).get('groups', [])
                 if not groups:
                     log_and_print(f"No external group found matching team name '{team_slug}'", "warning")
                     return False
                     
                 # Find the best matching group by name
-                matching_group = next((g for g in groups if g['group_name'].lower() == team_slug.lower()), None)
+                matching_group = next((g for g in groups if g['group_name'].lower() == team_slug_lower), None)
                 
                 if not matching_group:
                     log_and_print(f"No matching external group found for team '{team_slug}'", "warning")
@@ -489,6 +895,7 @@ def map_external_group_to_team(org_name, team_slug, token, group_id=None, idp_gr
         response = make_github_request('patch', url, headers=headers, json_data=data)
         
         if response.status_code in [200, 201]:
+            _invalidate_team_external_group_mapping(org_name, team_slug)
             log_and_print(f"Successfully mapped team '{team_slug}' to external group", "success")
             return True
         elif response.status_code == 404:
@@ -526,11 +933,7 @@ def check_team_external_group_mapping(org_name, team_slug, token, expected_group
             - is_mapped is a boolean indicating if the team is mapped to the expected group
             - group_data is a dict with details about the current mapping (or None if no mapping)
     """
-    headers = {
-        'Accept': 'application/vnd.github.v3+json',
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json'
-    }
+    headers = {**_DEFAULT_HEADERS, 'Authorization': f'Bearer {token}'}
     
     url = f"{GH_TARGET_BASE_API_URL}/orgs/{org_name}/teams/{team_slug}/external-groups"
     
@@ -539,7 +942,7 @@ def check_team_external_group_mapping(org_name, team_slug, token, expected_group
         response = make_github_request('get', url, headers=headers)
         
         if response.status_code == 200:
-            mapping_data = response.json()
+            mapping_data = _response_json(response)
             
             # Check if there's an existing mapping
             if mapping_data and 'groups' in mapping_data and mapping_data['groups']:
@@ -550,8 +953,8 @@ def check_team_external_group_mapping(org_name, team_slug, token, expected_group
                 log_and_print(f"Team '{team_slug}' is already correctly mapped to external group.  No changes needed.", "warning")
                 # If expected_group_name is provided, check if it matches
                 if expected_group_name:
-                    is_expected_group = (group_name.lower() == expected_group_name.lower() or 
-                                        expected_group_name.lower() in group_name.lower())
+                    # Normalize like the idp_group_cache lookup so groups matched there are recognized here
+                    is_expected_group = _idp_key(group_name) == _idp_key(expected_group_name)
                     
                     if is_expected_group:
                         log_and_print(f"Team '{team_slug}' is corectly mapped to the expected group '{group_name}'","success")
@@ -575,11 +978,29 @@ def check_team_external_group_mapping(org_name, team_slug, token, expected_group
         log_and_print(f"Error checking team external group mapping: {str(e)}", "error")
         return False, None
 
+def check_team_external_group_mapping_cached(org_name, team_slug, token, expected_group_name=None):
+    """Cached version of check_team_external_group_mapping"""
+    return _cached_team_lookup(
+        ('mapping', org_name, team_slug.lower(), (expected_group_name or '').lower()),
+        lambda: check_team_external_group_mapping(org_name, team_slug, token, expected_group_name),
+        lambda result: result[1] is None
+    )
+
+def _invalidate_team_external_group_mapping(org_name, team_slug):
+    """Drop cached external group mapping results for a team"""
+    with _team_lookup_lock:
+        for key in [k for k in _team_lookup_cache if k[:3] == ('mapping', org_name, team_slug.lower())]:
+            del _team_lookup_cache[key]
+
 
 --------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 # function to use smart rate handling and implement its core functionality
-def migrate_teams_optimized(gh_source, gh_target, source_org, target_org, output_folder, teams_to_migrate=None, migrate_users=False, map_idp_groups=False, migrate_parent_child=False):
-    """Optimized version of team migration that minimizes API calls"""
+def migrate_teams_optimized(gh_source, gh_target, source_org, target_org, output_folder, teams_to_migrate=None, migrate_users=False, map_idp_groups=False, migrate_parent_child=False, source_token=None, source_api_url=None):
+    """Optimized version of team migration that minimizes API calls
+    Args:
+        source_token: Optional source org token; with source_api_url, lets the source teams be listed via GraphQL
+        source_api_url: Optional REST API base URL of the source GitHub instance
+    """
     
     # Cache for API responses
     team_cache = {}
@@ -587,7 +1008,7 @@ def migrate_teams_optimized(gh_source, gh_target, source_org, target_org, output
     migration_details = {}
     
     # Get source org object
-    source_org_obj = gh_source.get_organization(source_org)
+    source_org_obj = _get_org(gh_source, source_org)
     
     # Check if specific teams are requested for migration
     if teams_to_migrate:
@@ -595,26 +1016,14 @@ def migrate_teams_optimized(gh_source, gh_target, source_org, target_org, output
         for team_name in teams_to_migrate:
             try:
                 team = source_org_obj.get_team_by_slug(team_name.strip())
-                team_cache[team.slug] = {
-                    'name': team.name,
-                    'description': team.description or '',
-                    'privacy': team.privacy,
-                    'parent': team.parent.slug if team.parent else None,
-                    'team_obj': team  # Store the team object to avoid re-fetching
-                }
+                team_cache[team.slug] = _team_cache_entry(team)
                 log_and_print(f"Fetched team: {team_name}")
             except RateLimitExceededException:
                 log_and_print(f"Rate limit reached fetching team '{team_name}'. Waiting for reset...", "error")
                 smart_rate_limit_handler(gh_source)
                 # Try again after waiting
                 team = source_org_obj.get_team_by_slug(team_name.strip())
-                team_cache[team.slug] = {
-                    'name': team.name,
-                    'description': team.description or '',
-                    'privacy': team.privacy,
-                    'parent': team.parent.slug if team.parent else None,
-                    'team_obj': team
-                }
+                team_cache[team.slug] = _team_cache_entry(team)
             except Exception as e:
                 log_and_print(f"Error fetching team '{team_name}': {str(e)}", "error")
                 # Continue with other teams
@@ -624,26 +1033,28 @@ def migrate_teams_optimized(gh_source, gh_target, source_org, target_org, output
         # Pre-fetch all teams from source in one API call if no specific teams requested
         log_and_print(f"Pre-fetching all teams from source organization...")
         
-        try:
-            # Get all source teams
-            all_source_teams = list(source_org_obj.get_teams())
-            log_and_print(f"Found {len(all_source_teams)} teams in source organization")
-            
-            # Cache teams from source organization
-            for team in all_source_teams:
-                team_cache[team.slug] = {
-                    'name': team.name,
-                    'description': team.description or '',
-                    'privacy': team.privacy,
-                    'parent': team.parent.slug if team.parent else None,
-                    'team_obj': team  # Store the team object to avoid re-fetching
-                }
-        except RateLimitExceededException:
-            log_and_print("Rate limit reached during initial team fetch. Waiting for reset...", "error")
-            smart_rate_limit_handler(gh_source)
-            # Retry
-            return migrate_teams_optimized(gh_source, gh_target, source_org, target_org, output_folder, 
-                                          teams_to_migrate, migrate_users, map_idp_groups, migrate_parent_child)
+        # A single paginated GraphQL query returns every field needed for the cache
+        if source_token and source_api_url:
+            try:
+                team_cache = fetch_all_teams_graphql(source_org, source_token, source_api_url) or {}
+            except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+                log_and_print(f"Error fetching teams via GraphQL, falling back to REST: {str(e)}", "warning")
+        
+        if team_cache:
+            log_and_print(f"Found {len(team_cache)} teams in source organization")
+        else:
+            # Cache source teams page by page as they arrive, retrying only the fetch on rate limit
+            for attempt in range(1, TEAM_RETRY_ATTEMPTS + 1):
+                try:
+                    for team in source_org_obj.get_teams():
+                        team_cache[team.slug] = _team_cache_entry(team)
+                    break
+                except RateLimitExceededException:
+                    if attempt == TEAM_RETRY_ATTEMPTS:
+                        raise
+                    log_and_print(f"Rate limit reached during initial team fetch (attempt {attempt}/{TEAM_RETRY_ATTEMPTS}). Waiting for reset...", "error")
+                    smart_rate_limit_handler(gh_source)
+            log_and_print(f"Found {len(team_cache)} teams in source organization")
     
     # Determine teams to migrate (now based on what we have in the cache)
     if not teams_to_migrate:
@@ -651,23 +1062,34 @@ def migrate_teams_optimized(gh_source, gh_target, source_org, target_org, output
     
     # PRE-FETCH TARGET TEAMS - critical optimization
     log_and_print(f"Pre-fetching all teams from target organization...")
-    target_org_obj = gh_target.get_organization(target_org)
+    target_org_obj = _get_org(gh_target, target_org)
     target_teams_cache = {}
     
-    try:
-        all_target_teams = list(target_org_obj.get_teams())
-        log_and_print(f"Found {len(all_target_teams)} teams in target organization")
-        
-        # Cache teams by name AND slug (case insensitive)
-        for team in all_target_teams:
-            target_teams_cache[team.name.lower()] = team  # Index by name
-            target_teams_cache[team.slug.lower()] = team  # Also index by slug
-    except RateLimitExceededException:
-        log_and_print("Rate limit reached during target team fetch. Waiting for reset...", "error")
-        smart_rate_limit_handler(gh_target)
-        # Retry
-        return migrate_teams_optimized(gh_source, gh_target, source_org, target_org, output_folder,     
-                                      teams_to_migrate, migrate_users, map_idp_groups, migrate_parent_child)
+    # Cache teams by their real slug (lowercased) as pages arrive
+    for attempt in range(1, TEAM_RETRY_ATTEMPTS + 1):
+        try:
+            for team in target_org_obj.get_teams():
+                target_teams_cache[team.slug.lower()] = team
+            break
+        except RateLimitExceededException:
+            if attempt == TEAM_RETRY_ATTEMPTS:
+                raise
+            log_and_print(f"Rate limit reached during target team fetch (attempt {attempt}/{TEAM_RETRY_ATTEMPTS}). Waiting for reset...", "error")
+            smart_rate_limit_handler(gh_target)
+    log_and_print(f"Found {len(target_teams_cache)} teams in target organization")
+    
+    # PRE-FETCH TARGET ORG MEMBERS once if users will be migrated
+    target_members_cache = None
+    if migrate_users and not map_idp_groups:
+        try:
+            log_and_print("Pre-fetching all members of target organization...")
+            target_members_cache = _graphql_list_org_members(GH_TARGET_TOKEN, target_org)
+            if target_members_cache is None:
+                # Fall back to REST pagination if the GraphQL query failed
+                target_members_cache = get_org_member_logins(gh_target, target_org)
+            log_and_print(f"Cached {len(target_members_cache)} target organization members")
+        except Exception as e:
+            log_and_print(f"Error fetching target organization members: {str(e)}", "error")
     
     # PRE-FETCH IDP GROUPS if mapping enabled
     idp_group_cache = {}
@@ -676,16 +1098,9 @@ def migrate_teams_optimized(gh_source, gh_target, source_org, target_org, output
             log_and_print("Pre-fetching all available IDP groups...")
             idp_groups = get_all_external_groups(target_org, GH_TARGET_TOKEN)
             
-            # Cache IDP groups by name (case insensitive)
+            # Cache IDP groups by normalized name, so "Team-XYZ", "team_xyz" and "team xyz" share one key
             for group in idp_groups:
-                group_name = group['group_name'].lower()
-                idp_group_cache[group_name] = group
-                
-                # Also cache by aliases or similar names if needed
-                # Example: "Team-XYZ" might be "team_xyz" or "team xyz" in IDP
-                normalized_name = group_name.replace('-', '_').replace(' ', '_')
-                if normalized_name != group_name:
-                    idp_group_cache[normalized_name] = group
+                idp_group_cache[_idp_key(group['group_name'])] = group
             
             log_and_print(f"Cached {len(idp_group_cache)} external IDP groups")
         except Exception as e:
@@ -694,10 +1109,10 @@ def migrate_teams_optimized(gh_source, gh_target, source_org, target_org, output
     # Track parent-child relationships
     parent_child_relationships = []
     if migrate_parent_child:
-        for team_slug, team_info in team_cache.items():
-            if team_info.get('parent'):
-                parent_child_relationships.append((team_slug, team_info['parent']))
-                
+        parent_child_relationships = [
+            (team_slug, team_info['parent']) for team_slug, team_info in team_cache.items() if team_info['parent']
+        ]
+        
         # Optimize creation order for parent-child relationships
         teams_to_migrate = optimize_parent_child_migration(parent_child_relationships, team_cache)
         log_and_print(f"Optimized team creation order for parent-child relationships")
@@ -710,86 +1125,92 @@ def migrate_teams_optimized(gh_source, gh_target, source_org, target_org, output
     batch_size = 100  # Adjust as needed
     batches = [teams_to_migrate[i:i+batch_size] for i in range(0, len(teams_to_migrate), batch_size)]
     
-    for batch_num, batch in enumerate(batches, 1):
-        log_and_print(f"Processing batch {batch_num}/{len(batches)} ({len(batch)} teams)")
+    def process_team(team_number, team_name):
+        """Migrate a single team, returning True if it hit the rate limit and must be retried"""
+        log_and_print(f"Processing team {team_number}/{total_teams}: {team_name}")
+        
+        # Normalized forms of the team name used for cache lookups
+        tn_lower = team_name.lower()
+        tn_idp_key = _idp_key(team_name)
+        
+        # Get team from cache
+        team_info = team_cache.get(tn_lower)
+        
+        # Skip teams without an IDP group before doing any other work
+        if map_idp_groups and tn_idp_key not in idp_group_cache:
+            log_and_print(f"IDP group '{team_name}' not found in cache. Skipping team creation.", "warning")
+            migration_status[team_name] = "skipped"
+            migration_details[team_name] = {
+                'description': (team_info or {}).get('description', ''),
+                'privacy': (team_info or {}).get('privacy', ''),
+                'total_members': 0,
+                'members_migrated': 0,
+                'members_failed': 0,
+                'member_details': [],
+                'idp_group_name': team_name,
+                'idp_mapping_status': 'group_not_found'
+            }
+            return False
+        
+        if not team_info:
+            log_and_print(f"Team {team_name} not found in source cache, skipping", "error")
+            migration_status[team_name] = "failed"
+            return False
         
-        for index, team_name in enumerate(batch, 1):
-            log_and_print(f"Processing team {(batch_num-1)*batch_size + index}/{total_teams}: {team_name}")
+        try:
+            # Initialize team details
+            team_details = {
+                'description': team_info['description'],
+                'privacy': team_info['privacy'],
+                'total_members': 0,
+                'members_migrated': 0,
+                'members_failed': 0,
+                'member_details': [],
+                'idp_group_name': team_name,
+                'idp_mapping_status': 'not_attempted'
+            }
             
-            # Get team from cache
-            team_info = team_cache.get(team_name.lower())
-            if not team_info:
-                log_and_print(f"Team {team_name} not found in source cache, skipping", "error")
-                migration_status[team_name] = "failed"
-                continue
+            # Teams without an IDP group were skipped above
+            idp_group_exists = map_idp_groups
             
-            try:
-                # Initialize team details
-                team_details = {
-                    'description': team_info['description'],
-                    'privacy': team_info['privacy'],
-                    'total_members': 0,
-                    'members_migrated': 0,
-                    'members_failed': 0,
-                    'member_details': [],
-                    'idp_group_name': team_name,
-                    'idp_mapping_status': 'not_attempted'
-                }
-                
-                # Check if IDP group exists using cache before proceeding
-                idp_group_exists = False
-                if map_idp_groups:
-                    idp_group_exists = team_name.lower() in idp_group_cache
-                    
-                    # if not idp_group_exists:
-                    #     # Try alternate spellings
-                    #     alt_name = team_name.lower().replace('-', '_').replace(' ', '_')
-                    #     if alt_name in idp_group_cache:
-                    #         idp_group_exists = True
-                    #         log_and_print(f"Found IDP group using alternate spelling: {alt_name}", "warning")
-                    
-                    if not idp_group_exists:
-                        log_and_print(f"IDP group '{team_name}' not found in cache. Skipping team creation.", "warning")
-                        migration_status[team_name] = "skipped"
-                        team_details['idp_mapping_status'] = 'group_not_found'
-                        migration_details[team_name] = team_details
-                        continue
-                
-                # Get source team object from cache
-                source_team = team_info.get('team_obj')
-                if not source_team:
-                    # Fall back to API call if not in cache
-                    source_team = source_org_obj.get_team_by_slug(team_name)
-                
-                # Create team in target org using cached teams
-                target_team, new_or_exist = create_gh_team(
-                    gh_target,
-                    target_org,
-                    team_name,
-                    team_info['description'],
-                    team_info['privacy'],
-                    target_teams_cache  # Pass cached teams to avoid repeated listing
-                )
+            # Fetch the source team object only when its members will be migrated
+            source_team = source_org_obj.get_team_by_slug(team_name) if (migrate_users and not map_idp_groups) else None
+            
+            # Create team in target org using cached teams
+            target_team, new_or_exist = create_gh_team(
+                gh_target,
+                target_org,
+                team_name,
+                team_info['description'],
+                team_info['privacy'],
+                target_teams_cache  # Pass cached teams to avoid repeated listing
+            )
+            
+            if target_team:
+                # Keep the cache current for new and existing teams so the parent-child pass never misses
+                target_teams_cache[tn_lower] = target_team
+                if target_team.slug.lower() != tn_lower:
+                    target_teams_cache[target_team.slug.lower()] = target_team
                 
-                if target_team:
-                    # Add new team to cache
-                    if new_or_exist == "new":
-                        target_teams_cache[team_name.lower()] = target_team
-                        target_teams_cache[target_team.slug.lower()] = target_team
-                    
-                    # Handle IDP mapping if requested
-                    if map_idp_groups and idp_group_exists:
-                        try:
-                            # Only check rate limit before a potentially expensive operation
-                            if index % 10 == 0:  # Check every 10th team
-                                smart_rate_limit_handler(gh_target)
-                                
-                            # Only need to fetch members and remove if new team or not already mapped
-                            is_mapped, _ = check_team_external_group_mapping(target_org, team_name, GH_TARGET_TOKEN, team_name)
+                # Handle IDP mapping if requested
+                if map_idp_groups and idp_group_exists:
+                    try:
+                        # Only check rate limit before a potentially expensive operation
+                        if team_number % 10 == 0:  # Check every 10th team
+                            smart_rate_limit_handler(gh_target)
                             
-                            if not is_mapped:
-                                # Remove existing members only if team is not already mapped
-                                target_team_members = []
+                        # A team created just now cannot be mapped yet, so only check existing teams
+                        is_new = (new_or_exist == "new")
+                        is_mapped = False if is_new else check_team_external_group_mapping_cached(target_org, team_name, GH_TARGET_TOKEN, team_name)[0]
+                        
+                        if not is_mapped:
+                            # Remove existing members only if team is not already mapped
+                            target_team_members = []
+                            # A freshly created team only contains its creator, no need to list members
+                            creator = _authenticated_login(gh_target) if is_new else None
+                            if creator:
+                                target_team_members.append(creator)
+                            else:
                                 try:
                                     log_and_print(f"Getting existing members of team '{team_name}' before IDP mapping")
                                     for member in target_team.get_members():
@@ -800,123 +1221,157 @@ def migrate_teams_optimized(gh_source, gh_target, source_org, target_org, output
                                     # Try again after waiting
                                     for member in target_team.get_members():
                                         target_team_members.append(member.login)
-                                
-                                if target_team_members:
-                                    log_and_print(f"Removing {len(target_team_members)} existing members from team '{team_name}' before IDP mapping")
-                                    success_count, failed_count, details = remove_users_from_team(
-                                        target_org, team_name, GH_TARGET_TOKEN, target_team_members
-                                    )
-                                    log_and_print(f"Removed {success_count} members, {failed_count} failed")
                             
-                                # Use the cached group_id if available
-                                group_id = None
-                                group_data = idp_group_cache.get(team_name.lower())
-                                if group_data:
-                                    group_id = group_data.get('group_id')
-                                
-                                # Map the team to the IDP group using the cache
-                                if map_external_group_to_team(target_org, team_name, GH_TARGET_TOKEN, group_id, idp_group_cache):
-                                    log_and_print(f"Successfully mapped team '{team_name}' to IDP group", "success")
-                                    team_details['idp_mapping_status'] = 'success'
-                                else:
-                                    log_and_print(f"Failed to map team '{team_name}' to IDP group", "error")
-                                    team_details['idp_mapping_status'] = 'failed'
-                            else:
-                                log_and_print(f"Team '{team_name}' is already mapped to an IDP group. Skipping mapping.", "success")
-                                team_details['idp_mapping_status'] = 'already_mapped'
-                                
-                        except Exception as e:
-                            log_and_print(f"Error mapping team to IDP group: {str(e)}", "error")
-                            team_details['idp_mapping_status'] = 'failed'
-                    
-                    # Migrate users if needed and not using IDP mapping
-                    if migrate_users and not map_idp_groups:
-                        # Only check rate limit before a potentially expensive operation
-                        if index % 5 == 0:  # Check every 5th team for user migration
-                            smart_rate_limit_handler(gh_target)
-                        
-                        # Migrate members with optimized approach
-                        member_results = migrate_team_members(source_team, target_team, gh_target, target_org)
-                        migration_status[team_name] = "success" if member_results['success'] else "partial_success"
+                            if target_team_members:
+                                log_and_print(f"Removing {len(target_team_members)} existing members from team '{team_name}' before IDP mapping")
+                                success_count, failed_count, details = remove_users_from_team(
+                                    target_org, team_name, GH_TARGET_TOKEN, target_team_members
+                                )
+                                log_and_print(f"Removed {success_count} members, {failed_count} failed")
                         
-                        # Update details with member results
-                        team_details.update({
-                            'total_members': member_results['total_members'],
-                            'members_migrated': member_results['members_migrated'],
-                            'members_failed': member_results['members_failed'],
-                            'member_details': member_results['member_details']
-                        })
-                    else:
-                        migration_status[team_name] = "success"
-                        
-                elif new_or_exist == "exist":
-                    log_and_print(f"Team '{team_name}' already exists in the target organization.", "info")
-                    migration_status[team_name] = "exists"
-                    if map_external_group_to_team(target_org, team_name, GH_TARGET_TOKEN):
-                        log_and_print(f"Successfully mapped team '{team_name}' to IDP group", "success")
-                        team_details['idp_mapping_status'] = 'success'
-                    else:
-                        log_and_print(f"Failed to map team '{team_name}' to IDP group", "error")
+                            # Use the cached group_id if available
+                            group_id = None
+                            group_data = idp_group_cache.get(tn_idp_key)
+                            if group_data:
+                                group_id = group_data.get('group_id')
+                            
+                            # Map the team to the IDP group using the cache
+                            if map_external_group_to_team(target_org, team_name, GH_TARGET_TOKEN, group_id, idp_group_cache, check_existing_mapping=not is_new):
+                                log_and_print(f"Successfully mapped team '{team_name}' to IDP group", "success")
+                                team_details['idp_mapping_status'] = 'success'
+                            else:
+                                log_and_print(f"Failed to map team '{team_name}' to IDP group", "error")
+                                team_details['idp_mapping_status'] = 'failed'
+                        else:
+                            log_and_print(f"Team '{team_name}' is already mapped to an IDP group. Skipping mapping.", "success")
+                            team_details['idp_mapping_status'] = 'already_mapped'
+                            
+                    except Exception as e:
+                        log_and_print(f"Error mapping team to IDP group: {str(e)}", "error")
                         team_details['idp_mapping_status'] = 'failed'
-                else:
-                    migration_status[team_name] = "failed"
-                
-                migration_details[team_name] = team_details
                 
-            except RateLimitExceededException:
-                log_and_print(f"Rate limit reached processing team '{team_name}'. Waiting for reset...", "error")
-                smart_rate_limit_handler(gh_target)
-                # Don't update status - retry this team in a recursive call
-                
-                # Create a new list with remaining teams
-                remaining_teams = batch[batch.index(team_name):] + [t for b in batches[batch_num:] for t in b]
-                return migrate_teams_optimized(gh_source, gh_target, source_org, target_org, output_folder,
-                                            remaining_teams, migrate_users, map_idp_groups, migrate_parent_child)
-                                            
-            except Exception as e:
-                log_and_print(f"Error processing team '{team_name}': {str(e)}", "error")
+                # Migrate users if needed and not using IDP mapping
+                if migrate_users and not map_idp_groups:
+                    # Only check rate limit before a potentially expensive operation
+                    if team_number % 5 == 0:  # Check every 5th team for user migration
+                        smart_rate_limit_handler(gh_target)
+                    
+                    # Migrate members with optimized approach
+                    member_results = migrate_team_members(source_team, target_team, gh_target, target_org, target_members_cache)
+                    migration_status[team_name] = "success" if member_results['success'] else "partial_success"
+                    
+                    # Update details with member results
+                    team_details.update({
+                        'total_members': member_results['total_members'],
+                        'members_migrated': member_results['members_migrated'],
+                        'members_failed': member_results['members_failed'],
+                        'member_details': member_results['member_details']
+                    })
+                else:
+                    migration_status[team_name] = "success"
+                    
+            else:
                 migration_status[team_name] = "failed"
-                migration_details[team_name] = team_details
+            
+            migration_details[team_name] = team_details
+            
+        except RateLimitExceededException:
+            log_and_print(f"Rate limit reached processing team '{team_name}'. Will retry after this batch.", "error")
+            # Don't update status - this team is retried after the batch
+            return True
+            
+        except Exception as e:
+            log_and_print(f"Error processing team '{team_name}': {str(e)}", "error")
+            migration_status[team_name] = "failed"
+            migration_details[team_name] = team_details
         
-        # After each batch, check rate limit status
-        if batch_num < len(batches):
-            smart_rate_limit_handler(gh_target)
+        return False
+    
+    # Stream per-team results to a JSON lines file so progress survives an interrupted run;
+    # append so a rerun after a crash keeps the records of earlier runs
+    os.makedirs(output_folder, exist_ok=True)
+    with open(os.path.join(output_folder, 'teams.jsonl'), 'a', buffering=1 << 20) as teams_log:
+        for batch_num, batch in enumerate(batches, 1):
+            log_and_print(f"Processing batch {batch_num}/{len(batches)} ({len(batch)} teams)")
+            
+            # Process the teams of a batch concurrently, retrying only the rate limited ones
+            first_team_number = (batch_num - 1) * batch_size + 1
+            pending = list(zip(range(first_team_number, first_team_number + len(batch)), batch))
+            attempt = 0
+            
+            while pending:
+                with ThreadPoolExecutor(max_workers=TEAM_MIGRATION_WORKERS) as executor:
+                    results = executor.map(lambda item: process_team(*item), pending)
+                    pending = [item for item, rate_limited in zip(pending, results) if rate_limited]
+                
+                if pending:
+                    attempt += 1
+                    if attempt > TEAM_RETRY_ATTEMPTS:
+                        for _, team_name in pending:
+                            log_and_print(f"Giving up on team '{team_name}' after {TEAM_RETRY_ATTEMPTS} rate limited attempts", "error")
+                            migration_status[team_name] = "failed"
+                        break
+                    
+                    log_and_print(f"Retrying {len(pending)} rate limited teams (attempt {attempt}/{TEAM_RETRY_ATTEMPTS})", "warning")
+                    smart_rate_limit_handler(gh_target)
+                    time.sleep(min(60, 2 ** attempt))
+            
+            # Record each finished team as soon as its batch completes
+            for team_name in batch:
+                if team_name in migration_status:
+                    record = {'team': team_name, 'status': migration_status[team_name], **migration_details.get(team_name, {})}
+                    teams_log.write(json.dumps(record) + '\n')
+            teams_log.flush()
+            
+            # After each batch, check rate limit status
+            if batch_num < len(batches):
+                smart_rate_limit_handler(gh_target)
     
     # Final step: Handle parent-child relationships if needed
     if migrate_parent_child and parent_child_relationships:
         log_and_print("Setting up parent-child relationships")
+        target_teams_cache_lock = threading.Lock()
         
-        # Process parent-child in batches to avoid rate limiting
-        for batch_num, relationship_batch in enumerate(
-            [parent_child_relationships[i:i+50] for i in range(0, len(parent_child_relationships), 50)], 1
-        ):
-            log_and_print(f"Processing parent-child batch {batch_num}/{(len(parent_child_relationships) + 49) // 50}")
-            
-            for child, parent in relationship_batch:
-                if child in migration_status and migration_status[child] in ["success", "exists"]:
-                    try:
-                        # Use cached objects when possible
-                        target_team = target_teams_cache.get(child.lower())
-                        parent_team = target_teams_cache.get(parent.lower())
-                        
-                        # Fall back to API call if not in cache
-                        if not target_team:
-                            target_team = get_team_by_name(gh_target, target_org, child)
-                            if target_team:
+        def set_parent(relationship):
+            """Set the parent of a single migrated child team"""
+            child, parent = relationship
+            if child in migration_status and migration_status[child] in ["success", "exists"]:
+                try:
+                    # Use cached objects when possible
+                    target_team = target_teams_cache.get(child.lower())
+                    parent_team = target_teams_cache.get(parent.lower())
+                    
+                    # Fall back to API call if not in cache
+                    if not target_team:
+                        target_team = get_team_by_name_cached(gh_target, target_org, child)
+                        if target_team:
+                            with target_teams_cache_lock:
                                 target_teams_cache[child.lower()] = target_team
-                                
-                        if not parent_team:
-                            parent_team = get_team_by_name(gh_target, target_org, parent)
-                            if parent_team:
+                            
+                    if not parent_team:
+                        parent_team = get_team_by_name_cached(gh_target, target_org, parent)
+                        if parent_team:
+                            with target_teams_cache_lock:
                                 target_teams_cache[parent.lower()] = parent_team
-                        
-                        if target_team and parent_team:
-                            set_team_parent(gh_target, target_org, target_team, parent_team)
-                    except Exception as e:
-                        log_and_print(f"Error setting parent for team '{child}': {str(e)}", "error")
+                    
+                    if target_team and parent_team:
+                        set_team_parent(gh_target, target_org, target_team, parent_team)
+                except Exception as e:
+                    log_and_print(f"Error setting parent for team '{child}': {str(e)}", "error")
+        
+        # Process parent-child in batches to avoid rate limiting
+        pc_batches = [parent_child_relationships[i:i+50] for i in range(0, len(parent_child_relationships), 50)]
+        total_pc = len(pc_batches)
+        
+        for batch_num, relationship_batch in enumerate(pc_batches, 1):
+            log_and_print(f"Processing parent-child batch {batch_num}/{total_pc}")
+            
+            # Parent links are independent of each other, so set them concurrently
+            with ThreadPoolExecutor(max_workers=PARENT_LINK_WORKERS) as executor:
+                list(executor.map(set_parent, relationship_batch))
             
             # Check rate limit after each batch
-            if batch_num < (len(parent_child_relationships) + 49) // 50:
+            if batch_num < total_pc:
                 smart_rate_limit_handler(gh_target)
     
     # Write final summary